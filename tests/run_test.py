@@ -1,5 +1,8 @@
 import unittest
+import sys
 from datetime import datetime, timedelta
+import numpy as np
+from netCDF4 import Dataset
 import cf
 import unifhy
 
@@ -10,86 +13,101 @@ from unifhycontrib.smart import (
 
 class TestContribution(unittest.TestCase):
 
-    def test_smart(self):
-
-        td = unifhy.TimeDomain.from_start_end_step(
+    # whether to also compare metadata of records (i.e. not only values)
+    full_verification = False
+
+    theta_t = (1.0, '1')
+    theta_c = (1.0, '1')
+    theta_h = (0.20845296027652363, '1')
+    theta_d = (0.24606006380093334, '1')
+    theta_s = (0.00012296588050682812, '1')
+    theta_z = (105.25734595830215, 'kg m-2')
+    theta_sk = (46.81961454361724 * 3600, 's')
+    theta_fk = (315.5490902162102 * 3600, 's')
+    theta_gk = (1066.7332319333473 * 3600, 's')
+    theta_rk = (10.640277777777778 * 3600, 's')
+
+    @classmethod
+    def setUpClass(cls):
+        # build time and space domains, datasets, and components once
+        # for all tests of the class
+        cls.td = unifhy.TimeDomain.from_start_end_step(
             start=datetime(2007, 1, 1, 0, 0, 0),
             end=datetime(2007, 3, 1, 0, 0, 0),
             step=timedelta(hours=1)
         )
 
-        sd = unifhy.LatLonGrid.from_extent_and_resolution(
+        cls.sd = unifhy.LatLonGrid.from_extent_and_resolution(
             latitude_extent=(51, 52),
             latitude_resolution=1,
             longitude_extent=(0, 1),
             longitude_resolution=1
         )
 
-        sd.cell_area = cf.read('in/cell_area.nc').select_field('cell_area')
-
-        ds = unifhy.DataSet(['in/rainfall_flux.nc',
-                             'in/potential_water_evapotranspiration_flux.nc'])
+        cls.sd.cell_area = cf.read('in/cell_area.nc').select_field('cell_area')
 
-        theta_t = (1.0, '1')
-        theta_c = (1.0, '1')
-        theta_h = (0.20845296027652363, '1')
-        theta_d = (0.24606006380093334, '1')
-        theta_s = (0.00012296588050682812, '1')
-        theta_z = (105.25734595830215, 'kg m-2')
-        theta_sk = (46.81961454361724 * 3600, 's')
-        theta_fk = (315.5490902162102 * 3600, 's')
-        theta_gk = (1066.7332319333473 * 3600, 's')
-        theta_rk = (10.640277777777778 * 3600, 's')
+        cls.ds = unifhy.DataSet(
+            ['in/rainfall_flux.nc',
+             'in/potential_water_evapotranspiration_flux.nc']
+        )
 
-        sl = SurfaceLayerComponent(
+        # read input data for the whole simulation period at once
+        # (rather than one slice of 100 time steps at a time)
+        cls.sl = SurfaceLayerComponent(
             saving_directory='out',
-            timedomain=td,
-            spacedomain=sd,
-            dataset=ds,
+            timedomain=cls.td,
+            spacedomain=cls.sd,
+            dataset=cls.ds,
             parameters={
-                'theta_t': theta_t,
-                'theta_z': theta_z
-            }
+                'theta_t': cls.theta_t,
+                'theta_z': cls.theta_z
+            },
+            io_slice=len(cls.td.time)
         )
 
-        ss = SubSurfaceComponent(
+        cls.ss = SubSurfaceComponent(
             saving_directory='out',
-            timedomain=td,
-            spacedomain=sd,
+            timedomain=cls.td,
+            spacedomain=cls.sd,
             dataset=None,
             parameters={
-                'theta_c': theta_c,
-                'theta_h': theta_h,
-                'theta_d': theta_d,
-                'theta_s': theta_s,
-                'theta_z': theta_z,
-                'theta_sk': theta_sk,
-                'theta_fk': theta_fk,
-                'theta_gk': theta_gk
+                'theta_c': cls.theta_c,
+                'theta_h': cls.theta_h,
+                'theta_d': cls.theta_d,
+                'theta_s': cls.theta_s,
+                'theta_z': cls.theta_z,
+                'theta_sk': cls.theta_sk,
+                'theta_fk': cls.theta_fk,
+                'theta_gk': cls.theta_gk
             }
         )
 
-        ow = OpenWaterComponent(
+        # keep records in memory for the whole simulation period and
+        # write them to file at once (rather than each simulated day)
+        cls.ow = OpenWaterComponent(
             saving_directory='out',
-            timedomain=td,
-            spacedomain=sd,
+            timedomain=cls.td,
+            spacedomain=cls.sd,
             parameters={
-                'theta_rk': theta_rk
+                'theta_rk': cls.theta_rk
             },
             records={
                 'outgoing_water_volume_transport_along_river_channel': {
                     timedelta(days=1): ['mean']
                 }
-            }
+            },
+            io_slice=len(cls.td.time)
         )
 
+    def test_smart(self):
+
         model = unifhy.Model(
             identifier='test-smart',
             config_directory='out',
             saving_directory='out',
-            surfacelayer=sl,
-            subsurface=ss,
-            openwater=ow
+            surfacelayer=self.sl,
+            subsurface=self.ss,
+            openwater=self.ow
         )
 
         model.to_yaml()
@@ -98,23 +116,43 @@ class TestContribution(unittest.TestCase):
 
         model.simulate()
 
-        from_file = unifhy.DataSet(
-            'in/outgoing_water_volume_transport_along_river_channel.nc'
-        )
+        var_name = 'outgoing_water_volume_transport_along_river_channel'
 
-        from_model = unifhy.DataSet(
-            'out/test-smart_openwater_run_records_daily.nc'
-        )
+        # compare record values (using cf-python default tolerances)
+        with Dataset(
+                'in/outgoing_water_volume_transport_along_river_channel.nc'
+        ) as f:
+            f.set_auto_mask(False)
+            from_file = f.variables[f'{var_name}_mean'][:]
 
-        var_name = 'outgoing_water_volume_transport_along_river_channel'
+        with Dataset('out/test-smart_openwater_run_records_daily.nc') as f:
+            f.set_auto_mask(False)
+            from_model = f.variables[f'{var_name}_mean'][:]
 
-        self.assertTrue(
-            from_file[var_name].field.equals(from_model[var_name].field,
-                                             verbose=3)
+        np.testing.assert_allclose(
+            from_model, from_file,
+            rtol=sys.float_info.epsilon, atol=sys.float_info.epsilon
         )
 
+        # compare record fields (i.e. including their metadata)
+        if self.full_verification:
+            from_file = unifhy.DataSet(
+                'in/outgoing_water_volume_transport_along_river_channel.nc'
+            )
+
+            from_model = unifhy.DataSet(
+                'out/test-smart_openwater_run_records_daily.nc'
+            )
+
+            self.assertTrue(
+                from_file[var_name].field.equals(from_model[var_name].field,
+                                                 verbose=3)
+            )
+
 
 if __name__ == '__main__':
+    TestContribution.full_verification = '--full' in sys.argv[1:]
+
     test_loader = unittest.TestLoader()
     test_suite = unittest.TestSuite()
 
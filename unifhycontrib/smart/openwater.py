@@ -1,6 +1,8 @@
 import numpy as np
+from numba import njit, prange
 
 import unifhy
+from unifhy.settings import dtype_float
 
 
 class OpenWaterComponent(unifhy.component.OpenWaterComponent):
@@ -53,7 +55,8 @@ class OpenWaterComponent(unifhy.component.OpenWaterComponent):
     }
     _states_info = {
         'river_store': {
-            'units': 'kg m-2'
+            'units': 'kg m-2',
+            'order': 'C'
         }
     }
     _constants_info = {
@@ -72,6 +75,8 @@ class OpenWaterComponent(unifhy.component.OpenWaterComponent):
     _requires_cell_area = True
 
     def initialise(self,
+                   # component parameters
+                   theta_rk,
                    # component states
                    river_store,
                    **kwargs):
@@ -79,6 +84,12 @@ class OpenWaterComponent(unifhy.component.OpenWaterComponent):
         if not self.initialised_states:
             river_store.set_timestep(-1, 0.)
 
+        # fraction of river store not flowing out over one time step
+        self._store_retention = np.ravel(
+            1. - self.timedelta_in_seconds / theta_rk
+        )
+        self._cell_area = np.ravel(self.spacedomain.cell_area)
+
     def run(self,
             # from exchanger
             surface_runoff_flux_delivered_to_rivers, 
@@ -93,44 +104,58 @@ class OpenWaterComponent(unifhy.component.OpenWaterComponent):
 
         dt = self.timedelta_in_seconds
 
-        total_runoff = (
-            surface_runoff_flux_delivered_to_rivers 
-            + net_groundwater_flux_to_rivers
-        )
-
-        # provisionally calculate river flow
-        river_store = (
-            river_store.get_timestep(0),
-            river_store.get_timestep(-1)
-        )
-        river_outflow = river_store[-1] / theta_rk
+        # bind river store at previous and current steps once
+        river_store_prv = river_store.get_timestep(-1).ravel()
+        river_store_crt = river_store.get_timestep(0).ravel()
 
-        # provisionally calculate new river store state
-        store = river_store[-1] + (total_runoff - river_outflow) * dt
+        # route total runoff through river channel
+        streamflow = np.empty(self.spaceshape, dtype_float())
 
-        # check whether store has gone negative
-        river_outflow = np.where(
-            store < 0,
-            # allow max outflow at 95% of what was in store
-            0.95 * (total_runoff + river_store[-1] / dt),
-            river_outflow
-        )
-        river_store[0][:] = (
-            river_store[-1] + (total_runoff - river_outflow) * dt
+        _river_routing_step(
+            np.asarray(surface_runoff_flux_delivered_to_rivers).ravel(),
+            np.asarray(net_groundwater_flux_to_rivers).ravel(),
+            river_store_prv, river_store_crt,
+            np.ravel(theta_rk), self._store_retention, self._cell_area,
+            rho_water, dt, streamflow.ravel()
         )
 
-        # convert [kg m-2 s-1] to [m3 s-1]
-        river_outflow = river_outflow / rho_water * self.spacedomain.cell_area
-
         return (
             # to exchanger
             {},
             # component outputs
             {
                 'outgoing_water_volume_transport_along_river_channel': 
-                    river_outflow
+                    streamflow
             }
         )
 
     def finalise(self, **kwargs):
         pass
+
+
+@njit(parallel=True, cache=True)
+def _river_routing_step(surface_runoff, subsurface_runoff, river_store_prv,
+                        river_store_crt, theta_rk, store_retention,
+                        cell_area, rho_water, dt, streamflow):
+    """Route the total runoff of each cell through the channel linear
+    reservoir and determine the resulting streamflow.
+
+    All array arguments are flat arrays over the cells, the current
+    river store and the streamflow are written in place.
+    """
+    for c in prange(river_store_prv.shape[0]):
+        total_runoff = surface_runoff[c] + subsurface_runoff[c]
+        store = river_store_prv[c]
+
+        # provisionally calculate river flow
+        river_outflow = store / theta_rk[c]
+
+        # check whether store would go negative with this river flow
+        if total_runoff * dt + store * store_retention[c] < 0:
+            # allow max outflow at 95% of what was in store
+            river_outflow = 0.95 * (total_runoff + store / dt)
+
+        river_store_crt[c] = store + (total_runoff - river_outflow) * dt
+
+        # convert [kg m-2 s-1] to [m3 s-1]
+        streamflow[c] = river_outflow / rho_water * cell_area[c]
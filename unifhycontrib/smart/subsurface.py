@@ -1,4 +1,5 @@
 import numpy as np
+from numba import njit, prange
 
 import unifhy
 from unifhy.settings import dtype_float
@@ -91,7 +92,8 @@ class SubSurfaceComponent(unifhy.component.SubSurfaceComponent):
     _states_info = {
         'soil_layers': {
             'units': 'kg m-2',
-            'divisions': 6
+            'divisions': 6,
+            'order': 'C'
         },
         'overland_store': {
             'units': 'kg m-2'
@@ -112,7 +114,7 @@ class SubSurfaceComponent(unifhy.component.SubSurfaceComponent):
 
     def initialise(self,
                    # component parameters
-                   theta_z,
+                   theta_z, theta_sk, theta_fk, theta_gk,
                    # component states
                    soil_layers, overland_store, drain_store,
                    inter_store, shallow_gw_store, deep_gw_store,
@@ -121,7 +123,22 @@ class SubSurfaceComponent(unifhy.component.SubSurfaceComponent):
         if not self.initialised_states:
             # initialise soil layers to be half full
             soil_layers.set_timestep(-1, theta_z[..., np.newaxis] / 6 / 2)  # kg m-2
-        
+
+        # allocate buffers re-used from one time step to the next
+        # (the five stores are stacked in the order overland, drain,
+        #  inter, shallow groundwater, and deep groundwater)
+        self._scratch = {
+            'excess_rain': np.empty(self.spaceshape, dtype_float()),
+            'unmet_peva': np.empty(self.spaceshape, dtype_float()),
+            'flows': np.empty((5, *self.spaceshape), dtype_float()),
+            'stores_prv': np.empty((5, *self.spaceshape), dtype_float()),
+            'stores_crt': np.empty((5, *self.spaceshape), dtype_float()),
+            'runoffs': np.empty((5, *self.spaceshape), dtype_float()),
+            'residence_times': np.stack(
+                [theta_sk, theta_sk, theta_fk, theta_gk, theta_gk]
+            )
+        }
+
     def run(self,
             # from exchanger
             canopy_liquid_throughfall_and_snow_melt_flux,
@@ -136,208 +153,60 @@ class SubSurfaceComponent(unifhy.component.SubSurfaceComponent):
             **kwargs):
 
         dt = self.timedelta_in_seconds
+        scratch = self._scratch
 
         # determine excess rain quantity from snowmelt and throughfall fluxes
-        excess_rain = canopy_liquid_throughfall_and_snow_melt_flux * dt
+        excess_rain = np.multiply(
+            canopy_liquid_throughfall_and_snow_melt_flux, dt,
+            out=scratch['excess_rain']
+        )
 
         # determine unmet ET quantity from ET fluxes
-        unmet_peva = transpiration_flux_from_root_uptake * dt
-
-        # determine limiting conditions
-        energy_limited = excess_rain > 0
-        water_limited = ~energy_limited
-
-        # initialise current soil layers to their level at previous step
-        soil_layers = (
-            soil_layers.get_timestep(0),
-            soil_layers.get_timestep(-1)
+        unmet_peva = np.multiply(
+            transpiration_flux_from_root_uptake, dt,
+            out=scratch['unmet_peva']
         )
-        soil_layers[0][:] = soil_layers[-1]
-
-        # --------------------------------------------------------------
-        # under energy-limited conditions
-        # >-------------------------------------------------------------
-
-        # calculate total antecedent soil moisture
-        soil_water = np.sum(soil_layers[-1], axis=-1)
-
-        # calculate surface runoff using quick runoff parameter H and
-        # relative soil moisture content
-        theta_h_prime = theta_h * (soil_water / theta_z)
-        # excess rainfall contribution to quick surface runoff store
-        overland_flow = theta_h_prime * excess_rain
-        # remainder that infiltrates
-        excess_rain -= overland_flow
-
-        # calculate percolation through soil layers
-        # (from top layer [1] to bottom layer [6])
-        layer_capacity = theta_z / 6.
-        for i in range(6):
-            layer_level = soil_layers[0][..., i]
-
-            # determine space in layer before reaching full capacity
-            layer_space = layer_capacity - layer_level
-
-            enough_space = excess_rain <= layer_space
-
-            # enough space in layer to hold entire excess rain
-            layer_level[:] = np.where(
-                energy_limited & enough_space,
-                layer_level + excess_rain,
-                layer_level
-            )
-            excess_rain[energy_limited & enough_space] = 0.
-
-            # not enough space in layer to hold entire excess rain
-            layer_level[:] = np.where(
-                energy_limited & ~enough_space,
-                layer_capacity,
-                layer_level
-            )
-            excess_rain = np.where(
-                energy_limited & ~enough_space,
-                excess_rain - layer_space,
-                excess_rain
-            )
-
-        # calculate saturation excess from remaining excess rainfall
-        # sat. excess contrib. (if not 0) to quick soil runoff store
-        drain_flow = theta_d * excess_rain
-        # sat. excess contrib. (if not 0) to slow soil runoff store
-        inter_flow = (1.0 - theta_d) * excess_rain
-
-        # -------------------------------------------------------------<
-
-        # calculate leak from soil layers
-        # (i.e. piston flow becoming active during rainfall events)
-        theta_s_prime = theta_s * (soil_water / theta_z)
-
-        # calculate soil moisture contributions to runoff stores
-        shallow_gw_flow = np.zeros(self.spaceshape, dtype_float())
-        deep_gw_flow = np.zeros(self.spaceshape, dtype_float())
-
-        for i in range(6):
-            layer_level = soil_layers[0][..., i]
-
-            # leak to interflow
-            leak_interflow = np.where(
-                energy_limited,
-                # soil moisture outflow reducing exponentially downwards
-                layer_level * (theta_s_prime ** (i + 1)),
-                # no soil moisture contribution to runoff store
-                0
-            )
-            inter_flow += leak_interflow
-            layer_level[:] = layer_level - leak_interflow
-
-            # leak to shallow groundwater flow
-            leak_shallow_gw_flow = np.where(
-                energy_limited,
-                # soil moisture outflow reducing linearly downwards
-                layer_level * (theta_s_prime / (i + 1)),
-                # no soil moisture contribution to runoff store
-                0
-            )
-            shallow_gw_flow += leak_shallow_gw_flow
-            layer_level[:] = layer_level - leak_shallow_gw_flow
-
-            # leak to deep groundwater flow
-            leak_deep_gw_flow = np.where(
-                energy_limited,
-                # soil moisture outflow reducing exponentially upwards
-                layer_level * (theta_s_prime ** (6 - i)),
-                # no soil moisture contribution to runoff store
-                0
-            )
-            deep_gw_flow += leak_deep_gw_flow
-            layer_level[:] = layer_level - leak_deep_gw_flow
-
-        # --------------------------------------------------------------
-        # under water-limited conditions
-        # >-------------------------------------------------------------
-
-        # attempt to satisfy PE from soil layers
-        # (from top layer [1] to bottom layer [6])
-        for i in range(6):
-            layer_level = soil_layers[0][..., i]
-
-            enough_moisture = unmet_peva <= layer_level
-
-            # enough soil moisture in layer
-            layer_level[:] = np.where(
-                water_limited & enough_moisture,
-                layer_level - unmet_peva,
-                layer_level
-            )
-            unmet_peva[water_limited & enough_moisture] = 0.
-
-            # not enough soil moisture in layer
-            layer_level[water_limited & ~enough_moisture] = 0.
-            unmet_peva = np.where(
-                water_limited & ~enough_moisture,
-                theta_c * (unmet_peva - layer_level),
-                unmet_peva
-            )
 
-        # -------------------------------------------------------------<
+        # bind soil layers at previous and current steps once
+        soil_layers_prv = soil_layers.get_timestep(-1).reshape(-1, 6)
+        soil_layers_crt = soil_layers.get_timestep(0).reshape(-1, 6)
 
-        # route runoff
+        # calculate percolation, leak, and evaporation through soil layers
+        flows = scratch['flows']
+        soil_water_stress = np.empty(self.spaceshape, dtype_float())
 
-        # overland
-        overland_store = (
-            overland_store.get_timestep(0),
-            overland_store.get_timestep(-1)
+        _soil_layers_step(
+            excess_rain.ravel(), unmet_peva.ravel(),
+            soil_layers_prv, soil_layers_crt,
+            np.ravel(theta_c), np.ravel(theta_h), np.ravel(theta_d),
+            np.ravel(theta_s), np.ravel(theta_z),
+            *flows.reshape(5, -1), soil_water_stress.ravel()
         )
-        overland_runoff = overland_store[-1] / theta_sk
-        overland_store[0][:] = (
-            overland_store[-1] + overland_flow - overland_runoff * dt
-        )
-        overland_store[0][:] *= overland_store[0] > 0
 
-        # drain
-        drain_store = (
-            drain_store.get_timestep(0),
-            drain_store.get_timestep(-1)
+        # route runoff through the five linear reservoirs at once
+        stores = (
+            overland_store, drain_store, inter_store,
+            shallow_gw_store, deep_gw_store
         )
-        drain_runoff = drain_store[-1] / theta_sk
-        drain_store[0][:] = (
-            drain_store[-1] + drain_flow - drain_runoff * dt
+        stores_prv = np.stack(
+            [store.get_timestep(-1) for store in stores],
+            out=scratch['stores_prv']
         )
-        drain_store[0][:] *= drain_store[0] > 0
+        stores_crt = scratch['stores_crt']
 
-        # inter
-        inter_store = (
-            inter_store.get_timestep(0),
-            inter_store.get_timestep(-1)
-        )
-        inter_runoff = inter_store[-1] / theta_fk
-        inter_store[0][:] = (
-            inter_store[-1] + inter_flow - inter_runoff * dt
+        runoffs = np.divide(
+            stores_prv, scratch['residence_times'], out=scratch['runoffs']
         )
-        inter_store[0][:] *= inter_store[0] > 0
+        flows += stores_prv
+        np.multiply(runoffs, dt, out=stores_crt)
+        np.subtract(flows, stores_crt, out=stores_crt)
+        np.maximum(stores_crt, 0., out=stores_crt)
 
-        # shallow groundwater
-        shallow_gw_store = (
-            shallow_gw_store.get_timestep(0),
-            shallow_gw_store.get_timestep(-1)
-        )
-        shallow_gw_runoff = shallow_gw_store[-1] / theta_gk
-        shallow_gw_store[0][:] = (
-            shallow_gw_store[-1] + shallow_gw_flow
-            - shallow_gw_runoff * dt
-        )
-        shallow_gw_store[0][:] *= shallow_gw_store[0] > 0
+        for store, store_crt in zip(stores, stores_crt):
+            store.set_timestep(0, store_crt)
 
-        # deep groundwater
-        deep_gw_store = (
-            deep_gw_store.get_timestep(0),
-            deep_gw_store.get_timestep(-1)
-        )
-        deep_gw_runoff = deep_gw_store[-1] / theta_gk
-        deep_gw_store[0][:] = (
-            deep_gw_store[-1] + deep_gw_flow - deep_gw_runoff * dt
-        )
-        deep_gw_store[0][:] *= deep_gw_store[0] > 0
+        (overland_runoff, drain_runoff, inter_runoff,
+         shallow_gw_runoff, deep_gw_runoff) = runoffs
 
         return (
             # to exchanger
@@ -347,7 +216,7 @@ class SubSurfaceComponent(unifhy.component.SubSurfaceComponent):
                 'net_groundwater_flux_to_rivers':
                     shallow_gw_runoff + deep_gw_runoff,
                 'soil_water_stress_for_transpiration':
-                    np.sum(soil_layers[0], axis=-1) / theta_z
+                    soil_water_stress
             },
             # component outputs
             {}
@@ -355,3 +224,147 @@ class SubSurfaceComponent(unifhy.component.SubSurfaceComponent):
 
     def finalise(self, **kwargs):
         pass
+
+
+@njit(parallel=True, cache=True)
+def _soil_layers_step(excess_rain, unmet_peva, soil_layers_prv,
+                      soil_layers_crt, theta_c, theta_h, theta_d, theta_s,
+                      theta_z, overland_flow, drain_flow, inter_flow,
+                      shallow_gw_flow, deep_gw_flow, soil_water_stress):
+    """Update the six soil layers of each cell and determine the flows
+    towards the five linear reservoirs, as well as the resulting soil
+    water stress.
+
+    All arguments are flat arrays over the cells (with an additional
+    trailing axis of size 6 for the soil layers), the current soil
+    layers, the five flows, and the soil water stress are written in
+    place.
+    """
+    for c in prange(soil_layers_prv.shape[0]):
+        rain = excess_rain[c]
+        peva = unmet_peva[c]
+
+        # determine limiting conditions
+        energy_limited = rain > 0
+
+        # initialise current soil layers to their level at previous step
+        # and calculate total antecedent soil moisture
+        soil_water = 0.
+        for i in range(6):
+            soil_layers_crt[c, i] = soil_layers_prv[c, i]
+            soil_water += soil_layers_prv[c, i]
+
+        # ----------------------------------------------------------
+        # under energy-limited conditions
+        # >---------------------------------------------------------
+
+        # calculate surface runoff using quick runoff parameter H and
+        # relative soil moisture content
+        theta_h_prime = theta_h[c] * (soil_water / theta_z[c])
+        # excess rainfall contribution to quick surface runoff store
+        overland = theta_h_prime * rain
+        # remainder that infiltrates
+        rain -= overland
+
+        # calculate percolation through soil layers
+        # (from top layer [1] to bottom layer [6])
+        if energy_limited:
+            layer_capacity = theta_z[c] / 6.
+            for i in range(6):
+                layer_level = soil_layers_crt[c, i]
+
+                # determine space in layer before reaching full capacity
+                layer_space = layer_capacity - layer_level
+
+                if rain <= layer_space:
+                    # enough space in layer to hold entire excess rain
+                    soil_layers_crt[c, i] = layer_level + rain
+                    rain = 0.
+                else:
+                    # not enough space in layer to hold entire excess rain
+                    soil_layers_crt[c, i] = layer_capacity
+                    rain -= layer_space
+
+        # calculate saturation excess from remaining excess rainfall
+        # sat. excess contrib. (if not 0) to quick soil runoff store
+        drain = theta_d[c] * rain
+        # sat. excess contrib. (if not 0) to slow soil runoff store
+        inter = (1.0 - theta_d[c]) * rain
+
+        # ---------------------------------------------------------<
+
+        # calculate leak from soil layers
+        # (i.e. piston flow becoming active during rainfall events)
+        theta_s_prime = theta_s[c] * (soil_water / theta_z[c])
+
+        # calculate soil moisture contributions to runoff stores
+        shallow_gw = 0.
+        deep_gw = 0.
+
+        if energy_limited:
+            # tabulate powers of S' (i.e. S'**1 to S'**6) to avoid
+            # evaluating powers for each layer
+            power_2 = theta_s_prime * theta_s_prime
+            power_3 = power_2 * theta_s_prime
+            power_4 = power_2 * power_2
+            powers = (
+                theta_s_prime, power_2, power_3, power_4,
+                power_4 * theta_s_prime, power_3 * power_3
+            )
+
+            for i in range(6):
+                layer_level = soil_layers_crt[c, i]
+
+                # leak to interflow
+                # (soil moisture outflow reducing exponentially downwards)
+                leak = layer_level * powers[i]
+                inter += leak
+                layer_level -= leak
+
+                # leak to shallow groundwater flow
+                # (soil moisture outflow reducing linearly downwards)
+                leak = layer_level * (theta_s_prime / (i + 1))
+                shallow_gw += leak
+                layer_level -= leak
+
+                # leak to deep groundwater flow
+                # (soil moisture outflow reducing exponentially upwards)
+                leak = layer_level * powers[5 - i]
+                deep_gw += leak
+                layer_level -= leak
+
+                soil_layers_crt[c, i] = layer_level
+
+        else:
+            # ------------------------------------------------------
+            # under water-limited conditions
+            # >-----------------------------------------------------
+
+            # attempt to satisfy PE from soil layers
+            # (from top layer [1] to bottom layer [6])
+            for i in range(6):
+                layer_level = soil_layers_crt[c, i]
+
+                if peva <= layer_level:
+                    # enough soil moisture in layer
+                    soil_layers_crt[c, i] = layer_level - peva
+                    peva = 0.
+                else:
+                    # not enough soil moisture in layer
+                    soil_layers_crt[c, i] = 0.
+                    peva = theta_c[c] * peva
+
+            # -----------------------------------------------------<
+
+        overland_flow[c] = overland
+        drain_flow[c] = drain
+        inter_flow[c] = inter
+        shallow_gw_flow[c] = shallow_gw
+        deep_gw_flow[c] = deep_gw
+
+        # calculate total soil moisture remaining in soil layers
+        soil_water = 0.
+        for i in range(6):
+            soil_water += soil_layers_crt[c, i]
+
+        soil_water_stress[c] = soil_water / theta_z[c]
@@ -1,6 +1,8 @@
 import numpy as np
+from numba import njit, prange
 
 import unifhy
+from unifhy.settings import dtype_float
 
 
 class SurfaceLayerComponent(unifhy.component.SurfaceLayerComponent):
@@ -98,55 +100,18 @@ class SurfaceLayerComponent(unifhy.component.SurfaceLayerComponent):
 
         dt = self.timedelta_in_seconds
 
-        # apply parameter T to rainfall data (aerial rainfall correction)
-        corrected_rain = rainfall_flux * theta_t
-
-        # determine limiting conditions
-        rain_minus_peva = (
-            corrected_rain - potential_water_evapotranspiration_flux
-        )
-        energy_limited = rain_minus_peva > 0.0
-        water_limited = ~energy_limited
-
-        # --------------------------------------------------------------
-        # under energy-limited conditions
-        # >-------------------------------------------------------------
-
-        effective_rain = np.where(
-            energy_limited, rain_minus_peva, 0.0
-        )
-
-        # -------------------------------------------------------------<
-
-        # --------------------------------------------------------------
-        # under water-limited conditions
-        # >-------------------------------------------------------------
-
-        # ignore cells where there is rain excess
-        unmet_peva = np.where(
-            water_limited, -rain_minus_peva, 0.0
-        )
-
-        # provisionally set soil evaporation as total available moisture
-        soil_water = soil_water_stress_for_transpiration * theta_z
-        max_soil_evaporation = np.where(
-            water_limited, soil_water / dt, 0.0
-        )
-
-        # limit contribution to unmet ET where there is moisture excess
-        soil_evaporation = np.where(
-            max_soil_evaporation >= unmet_peva,
-            unmet_peva,
-            max_soil_evaporation
-        )
-
-        # -------------------------------------------------------------<
-
-        # calculate actual evapotranspiration
-        actual_evapotranspiration = np.where(
-            energy_limited,
-            potential_water_evapotranspiration_flux,
-            corrected_rain + soil_evaporation
+        # meet PE demand with rain and soil moisture
+        effective_rain = np.empty(self.spaceshape, dtype_float())
+        soil_evaporation = np.empty(self.spaceshape, dtype_float())
+        actual_evapotranspiration = np.empty(self.spaceshape, dtype_float())
+
+        _surface_layer_step(
+            np.asarray(rainfall_flux).ravel(),
+            np.asarray(potential_water_evapotranspiration_flux).ravel(),
+            np.asarray(soil_water_stress_for_transpiration).ravel(),
+            np.ravel(theta_t), np.ravel(theta_z), dt,
+            effective_rain.ravel(), soil_evaporation.ravel(),
+            actual_evapotranspiration.ravel()
         )
 
         return (
@@ -166,3 +131,56 @@ class SurfaceLayerComponent(unifhy.component.SurfaceLayerComponent):
 
     def finalise(self, **kwargs):
         pass
+
+
+@njit(parallel=True, cache=True)
+def _surface_layer_step(rainfall_flux, potential_evapotranspiration,
+                        soil_water_stress, theta_t, theta_z, dt,
+                        effective_rain, soil_evaporation,
+                        actual_evapotranspiration):
+    """Determine the throughfall, the soil evaporation, and the actual
+    evapotranspiration of each cell.
+
+    All array arguments are flat arrays over the cells, the throughfall,
+    the soil evaporation, and the actual evapotranspiration are written
+    in place.
+    """
+    for c in prange(rainfall_flux.shape[0]):
+        peva = potential_evapotranspiration[c]
+
+        # apply parameter T to rainfall data (aerial rainfall correction)
+        corrected_rain = rainfall_flux[c] * theta_t[c]
+
+        # determine limiting conditions
+        # (energy-limited where rain exceeds PE, water-limited otherwise)
+        rain_minus_peva = corrected_rain - peva
+
+        # ----------------------------------------------------------
+        # under energy-limited conditions
+        # >---------------------------------------------------------
+
+        # rain excess (zero where water-limited)
+        effective_rain[c] = max(rain_minus_peva, 0.)
+
+        # ---------------------------------------------------------<
+
+        # ----------------------------------------------------------
+        # under water-limited conditions
+        # >---------------------------------------------------------
+
+        # PE not met by rain (zero where energy-limited)
+        unmet_peva = max(-rain_minus_peva, 0.)
+
+        # provisionally set soil evaporation as total available moisture
+        max_soil_evaporation = soil_water_stress[c] * theta_z[c] / dt
+
+        # limit contribution to unmet ET where there is moisture excess
+        # (zero where energy-limited since there is no unmet PE)
+        evaporation = min(max_soil_evaporation, unmet_peva)
+        soil_evaporation[c] = evaporation
+
+        # ---------------------------------------------------------<
+
+        # calculate actual evapotranspiration
+        # (PE where energy-limited, rain and soil evaporation otherwise)
+        actual_evapotranspiration[c] = min(corrected_rain, peva) + evaporation